@@ -0,0 +1,40 @@
+"""
+Shared Firmware Helpers
+Firmware mapping and byte-offset indexing shared by the analysis scripts
+"""
+import contextlib
+import mmap
+import os
+
+
+@contextlib.contextmanager
+def load_firmware(path):
+    """Memory-map a firmware image read-only for the duration of a with block"""
+    with open(path, "rb") as f:
+        # mmap() rejects zero-length files (e.g. an interrupted extraction)
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def byte_offsets(data, byte_values):
+    """Map each of `byte_values` to the offsets where it occurs in `data`
+
+    For callers that need the positions themselves; use bytes.count for counts.
+    """
+    offsets = {}
+    for b in byte_values:
+        # A 1-byte find() is a memchr() call that skips to the next hit, so
+        # Python only runs once per offset collected rather than once per byte
+        needle = bytes([b])
+        found = []
+        i = data.find(needle)
+        while i >= 0:
+            found.append(i)
+            i = data.find(needle, i + 1)
+        offsets[b] = tuple(found)
+
+    return offsets
@@ -4,22 +4,29 @@ TFT Display Configuration Analyzer
 Searches factory firmware for TFT driver info, initialization sequences, and pin configs
 """
 import re
+import sys
+from collections import Counter
 from pathlib import Path
 
+from _firmware import load_firmware
+
+# Printable ASCII runs of at least 4 characters (same threshold as `strings`)
+ASCII_RUN_RE = re.compile(b"[\x20-\x7e]{4,}")
+
+# Bytes counted per slice in search_init_commands (small enough to stay in cache)
+COUNT_CHUNK = 1024 * 1024
+
 
 def search_strings(data, keywords):
     """Extract and filter ASCII strings from binary data"""
-    strings = re.findall(b"[\x20-\x7e]{4,}", data)
-    relevant = []
+    keyword_re = re.compile(b"|".join(map(re.escape, keywords)), re.IGNORECASE)
+    # Firmware repeats the same strings a lot; dedupe before filtering so each
+    # distinct string is searched and decoded once
+    unique = set(ASCII_RUN_RE.findall(data))
+    relevant = [s for s in unique if keyword_re.search(s)]
 
-    for s in strings:
-        if any(kw.lower() in s.lower() for kw in keywords):
-            try:
-                relevant.append(s.decode("ascii"))
-            except:
-                pass
-
-    return sorted(set(relevant))
+    # ASCII_RUN_RE only matches 0x20-0x7e, so decoding cannot fail
+    return sorted(s.decode("ascii") for s in relevant)
 
 
 def search_drivers(data):
@@ -35,14 +42,15 @@ def search_drivers(data):
         "HX8357D",
     ]
 
-    found = {}
-    for driver in drivers:
-        pattern = driver.encode("ascii")
-        matches = [m.start() for m in re.finditer(pattern, data, re.IGNORECASE)]
-        if matches:
-            found[driver] = len(matches)
+    # One alternation pass over the firmware instead of a scan per driver
+    pattern = re.compile(
+        b"|".join(re.escape(d.encode("ascii")) for d in drivers), re.IGNORECASE
+    )
+    found = Counter(
+        m.group().upper().decode("ascii") for m in pattern.finditer(data)
+    )
 
-    return found
+    return dict(found)
 
 
 def search_init_commands(data):
@@ -61,9 +69,18 @@ def search_init_commands(data):
         0xE1: "Negative Gamma",
     }
 
+    # Stream the image once in cache-sized chunks and count every command byte
+    # in each chunk with bytes.count (mmap has no count() of its own). A
+    # single byte can't straddle a chunk boundary, so the totals are exact.
+    counts = dict.fromkeys(ili_commands, 0)
+    for start in range(0, len(data), COUNT_CHUNK):
+        chunk = data[start : start + COUNT_CHUNK]
+        for cmd in ili_commands:
+            counts[cmd] += chunk.count(bytes([cmd]))
+
     found_commands = []
     for cmd, name in ili_commands.items():
-        count = data.count(bytes([cmd]))
+        count = counts[cmd]
         if count > 0:
             found_commands.append((cmd, name, count))
 
@@ -79,27 +96,6 @@ def main(firmware_file="factory_app0.bin"):
         print("  Run extract_partition.py first to extract the factory app")
         return
 
-    data = firmware_path.read_bytes()
-
-    print("=" * 70)
-    print("TFT Display Configuration Analysis")
-    print("=" * 70)
-    print(f"Analyzing: {firmware_path.name} ({len(data):,} bytes)\n")
-
-    # Search for TFT drivers
-    print("TFT Driver Strings:")
-    print("-" * 70)
-    drivers = search_drivers(data)
-    if drivers:
-        for driver, count in sorted(drivers.items()):
-            print(f"  ✓ {driver}: {count} occurrence(s)")
-    else:
-        print("  No driver strings found")
-
-    # Search for TFT-related strings
-    print("\n" + "=" * 70)
-    print("TFT Configuration Strings:")
-    print("-" * 70)
     keywords = [
         b"TFT",
         b"LCD",
@@ -115,30 +111,55 @@ def main(firmware_file="factory_app0.bin"):
         b"init",
         b"rotation",
     ]
-    relevant_strings = search_strings(data, keywords)
+
+    with load_firmware(firmware_path) as data:
+        drivers = search_drivers(data)
+        relevant_strings = search_strings(data, keywords)
+        commands = search_init_commands(data)
+
+    size = firmware_path.stat().st_size
+
+    lines = []
+    lines.append("=" * 70)
+    lines.append("TFT Display Configuration Analysis")
+    lines.append("=" * 70)
+    lines.append(f"Analyzing: {firmware_path.name} ({size:,} bytes)\n")
+
+    # Search for TFT drivers
+    lines.append("TFT Driver Strings:")
+    lines.append("-" * 70)
+    if drivers:
+        for driver, count in sorted(drivers.items()):
+            lines.append(f"  ✓ {driver}: {count} occurrence(s)")
+    else:
+        lines.append("  No driver strings found")
+
+    # Search for TFT-related strings
+    lines.append("\n" + "=" * 70)
+    lines.append("TFT Configuration Strings:")
+    lines.append("-" * 70)
     if relevant_strings:
         for s in relevant_strings[:20]:  # First 20 matches
-            print(f"  • {s}")
+            lines.append(f"  • {s}")
         if len(relevant_strings) > 20:
-            print(f"  ... and {len(relevant_strings) - 20} more")
+            lines.append(f"  ... and {len(relevant_strings) - 20} more")
     else:
-        print("  No relevant strings found")
+        lines.append("  No relevant strings found")
 
     # Search for initialization commands
-    print("\n" + "=" * 70)
-    print("Display Initialization Commands:")
-    print("-" * 70)
-    commands = search_init_commands(data)
+    lines.append("\n" + "=" * 70)
+    lines.append("Display Initialization Commands:")
+    lines.append("-" * 70)
     if commands:
         for cmd_byte, name, count in sorted(commands):
-            print(f"  0x{cmd_byte:02X} ({name}): {count} occurrence(s)")
+            lines.append(f"  0x{cmd_byte:02X} ({name}): {count} occurrence(s)")
     else:
-        print("  No init commands found")
+        lines.append("  No init commands found")
 
     # Known ESP32-2432S028 pin configuration
-    print("\n" + "=" * 70)
-    print("Known ESP32-2432S028 Pin Configuration:")
-    print("-" * 70)
+    lines.append("\n" + "=" * 70)
+    lines.append("Known ESP32-2432S028 Pin Configuration:")
+    lines.append("-" * 70)
     known_pins = {
         23: "MOSI (SPI Data)",
         19: "MISO (SPI Data)",
@@ -151,10 +172,12 @@ def main(firmware_file="factory_app0.bin"):
     }
 
     for pin, func in sorted(known_pins.items()):
-        print(f"  GPIO {pin:2d} = {func}")
+        lines.append(f"  GPIO {pin:2d} = {func}")
+
+    lines.append("\n" + "=" * 70)
+    lines.append(f"✓ Analysis complete")
 
-    print("\n" + "=" * 70)
-    print(f"✓ Analysis complete")
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 if __name__ == "__main__":
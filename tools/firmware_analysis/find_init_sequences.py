@@ -3,33 +3,80 @@
 Advanced Initialization Sequence Finder
 Locates and displays TFT display initialization command sequences in firmware
 """
+import os
+import re
+import sys
 from pathlib import Path
 
-
-def find_command_sequences(data, cmd_byte, name, nearby_cmds):
-    """Find instances of a command byte and show context"""
-    matches = []
-
-    for i in range(len(data)):
-        if data[i] == cmd_byte:
-            # Get surrounding context
-            start = max(0, i - 10)
-            end = min(len(data), i + 20)
-            context_before = data[start:i]
-            context_after = data[i + 1 : end]
-
-            # Check if this looks like a command sequence
-            # (surrounded by other known command bytes or small parameter values)
-            if any(b in nearby_cmds or b < 10 for b in context_after[:5]):
-                matches.append(
-                    {
-                        "offset": i,
-                        "before": context_before[-10:],
-                        "after": context_after[:15],
-                    }
-                )
-
-    return matches
+from _firmware import byte_offsets, load_firmware
+
+# Optional Numba fast path. Importing numba costs more than the stdlib scan
+# on a single firmware image, so it is opt-in via FIRMWARE_ANALYSIS_NUMBA=1
+njit = None
+if os.environ.get("FIRMWARE_ANALYSIS_NUMBA") == "1":
+    try:
+        import numpy as np
+        from numba import njit
+    except ImportError:
+        print("! numba/numpy not installed, using the stdlib scan", file=sys.stderr)
+
+
+# Known init command bytes that tend to appear close together
+NEARBY_CMDS = (0x11, 0x29, 0x36, 0x3A, 0xB1, 0xB6, 0xC0, 0xC1, 0xC5, 0xE0, 0xE1)
+
+# 256-entry table flagging every byte value that can follow a real command:
+# another known command byte or a small parameter value
+NEARBY_LUT = bytes(b in NEARBY_CMDS or b < 10 for b in range(256))
+
+# The same table as a compiled character class (re stores it as a bitmap)
+NEARBY_RE = re.compile(
+    b"["
+    + b"".join(re.escape(bytes([b])) for b in range(256) if NEARBY_LUT[b])
+    + b"]"
+)
+
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _scan_sequences(arr, cmd, lut):
+        """Offsets of `cmd` followed within 5 bytes by a byte flagged in `lut`"""
+        n = arr.size
+
+        # Size the result by the number of `cmd` bytes, not the image
+        total = 0
+        for i in range(n):
+            if arr[i] == cmd:
+                total += 1
+
+        out = np.empty(total, np.int64)
+        k = 0
+        for i in range(n):
+            if arr[i] == cmd:
+                for j in range(i + 1, min(n, i + 6)):
+                    if lut[arr[j]]:
+                        out[k] = i
+                        k += 1
+                        break
+        return out[:k]
+
+
+def find_command_sequences(data, cmd_bytes):
+    """Map each command byte to offsets that look like part of a command sequence"""
+    if njit is not None:
+        arr = np.frombuffer(data, dtype=np.uint8)
+        lut = np.frombuffer(NEARBY_LUT, dtype=np.uint8)
+        return {cmd: _scan_sequences(arr, cmd, lut).tolist() for cmd in cmd_bytes}
+
+    # Index only the requested command bytes, all in one byte_offsets() call
+    offsets = byte_offsets(data, frozenset(cmd_bytes))
+
+    # Looks like a command sequence if one of the next 5 bytes is flagged in
+    # NEARBY_LUT. Only offsets are kept; context is sliced when printed.
+    return {
+        cmd: [i for i in offsets[cmd] if NEARBY_RE.search(data, i + 1, i + 6)]
+        for cmd in cmd_bytes
+    }
 
 
 def main(firmware_file="factory_app0.bin"):
@@ -41,12 +88,11 @@ def main(firmware_file="factory_app0.bin"):
         print("  Run extract_partition.py first")
         return
 
-    data = firmware_path.read_bytes()
-
-    print("=" * 70)
-    print("Display Initialization Sequence Finder")
-    print("=" * 70)
-    print(f"Analyzing: {firmware_path.name}\n")
+    lines = []
+    lines.append("=" * 70)
+    lines.append("Display Initialization Sequence Finder")
+    lines.append("=" * 70)
+    lines.append(f"Analyzing: {firmware_path.name}\n")
 
     # Key commands that indicate initialization sequences
     key_commands = {
@@ -56,32 +102,35 @@ def main(firmware_file="factory_app0.bin"):
         0x29: "Display On (usually last command)",
     }
 
-    nearby_cmds = set(
-        [0x11, 0x29, 0x36, 0x3A, 0xB1, 0xB6, 0xC0, 0xC1, 0xC5, 0xE0, 0xE1]
-    )
+    with load_firmware(firmware_path) as data:
+        sequences = find_command_sequences(data, key_commands)
+
+        for cmd_byte, description in key_commands.items():
+            matches = sequences[cmd_byte]
 
-    for cmd_byte, description in key_commands.items():
-        matches = find_command_sequences(data, cmd_byte, description, nearby_cmds)
+            if matches:
+                lines.append(f"0x{cmd_byte:02X} - {description}")
+                lines.append("-" * 70)
 
-        if matches:
-            print(f"0x{cmd_byte:02X} - {description}")
-            print("-" * 70)
+                for offset in matches[:5]:  # Show first 5 matches
+                    before = data[max(0, offset - 10) : offset]
+                    after = data[offset + 1 : offset + 16]
+                    before_hex = " ".join(f"{b:02x}" for b in before)
+                    after_hex = " ".join(f"{b:02x}" for b in after)
+                    lines.append(f"  @0x{offset:08X}")
+                    lines.append(f"    Before: {before_hex}")
+                    lines.append(f"    After:  {after_hex}")
 
-            for match in matches[:5]:  # Show first 5 matches
-                before_hex = " ".join(f"{b:02x}" for b in match["before"])
-                after_hex = " ".join(f"{b:02x}" for b in match["after"])
-                print(f"  @0x{match['offset']:08X}")
-                print(f"    Before: {before_hex}")
-                print(f"    After:  {after_hex}")
+                if len(matches) > 5:
+                    lines.append(f"  ... and {len(matches) - 5} more occurrences")
+                lines.append("")
 
-            if len(matches) > 5:
-                print(f"  ... and {len(matches) - 5} more occurrences")
-            print()
+    lines.append("=" * 70)
+    lines.append("✓ Sequence search complete")
+    lines.append("\nNote: Look for 0x11 followed by delays, then 0x3A with 0x55,")
+    lines.append("      ending with 0x29 for a typical init sequence.")
 
-    print("=" * 70)
-    print("✓ Sequence search complete")
-    print("\nNote: Look for 0x11 followed by delays, then 0x3A with 0x55,")
-    print("      ending with 0x29 for a typical init sequence.")
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 if __name__ == "__main__":